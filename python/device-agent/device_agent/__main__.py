@@ -3,8 +3,10 @@
 SD-WAN Device Agent - Main Entry Point
 """
 
+import asyncio
 import sys
 import logging
+from prometheus_client import start_http_server
 from device_agent.agent import DeviceAgent
 from device_agent.config import load_config
 
@@ -20,9 +22,12 @@ def main():
             format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
         )
         
+        # Expose agent metrics for Prometheus to scrape
+        start_http_server(config.get('prometheus_port', 9092))
+        
         # Create and start the device agent
         agent = DeviceAgent(config)
-        agent.start()
+        asyncio.run(agent.run())
         
     except KeyboardInterrupt:
         logging.info("Device agent stopped by user")
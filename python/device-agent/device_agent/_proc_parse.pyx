@@ -0,0 +1,63 @@
+# cython: language_level=3
+"""
+Compiled /proc parsers for the SD-WAN Device Agent
+"""
+
+
+def parse_net_dev(bytes buf):
+    """Return (name, rx_bytes, tx_bytes) for every interface in /proc/net/dev."""
+    cdef const char *p = buf
+    cdef Py_ssize_t n = len(buf)
+    cdef Py_ssize_t i = 0
+    cdef Py_ssize_t name_start, name_end
+    cdef int lines = 0
+    cdef int field
+    cdef unsigned long long value, rx, tx
+    rows = []
+    
+    # Skip header lines
+    while i < n and lines < 2:
+        if p[i] == c'\n':
+            lines += 1
+        i += 1
+    
+    while i < n:
+        while i < n and p[i] == c' ':
+            i += 1
+        
+        # Counters may be glued to the name ("eth0:123"), so scan to the colon
+        name_start = i
+        while i < n and p[i] != c':' and p[i] != c'\n':
+            i += 1
+        if i >= n or p[i] != c':':
+            i += 1
+            continue
+        name_end = i
+        i += 1
+        
+        # rx_bytes is the first counter and tx_bytes the ninth
+        field = 0
+        rx = tx = 0
+        while field < 9:
+            while i < n and (p[i] == c' ' or p[i] == c'\t'):
+                i += 1
+            if i >= n or p[i] < c'0' or p[i] > c'9':
+                break
+            value = 0
+            while i < n and c'0' <= p[i] <= c'9':
+                value = value * 10 + (p[i] - c'0')
+                i += 1
+            if field == 0:
+                rx = value
+            elif field == 8:
+                tx = value
+            field += 1
+        
+        if field == 9:
+            rows.append((buf[name_start:name_end].decode(), rx, tx))
+        
+        while i < n and p[i] != c'\n':
+            i += 1
+        i += 1
+    
+    return rows
@@ -3,10 +3,31 @@
 SD-WAN Device Agent
 """
 
+import asyncio
+import os
+import signal
 import time
 import logging
-import requests
-from typing import Dict, Any
+import aiohttp
+from typing import Callable, Dict, Any, List, Optional, Set, Tuple
+
+from device_agent.metrics import CPU_USAGE, IFACE_BYTES, MEM_USAGE
+
+_dumps: Callable[[Any], bytes]
+try:
+    import orjson
+    _dumps = orjson.dumps
+except ImportError:
+    import json
+
+    def _json_dumps(obj: Any) -> bytes:
+        return json.dumps(obj).encode()
+    _dumps = _json_dumps
+
+try:
+    from device_agent._proc_parse import parse_net_dev
+except ImportError:
+    from device_agent.proc_parse import parse_net_dev
 
 class DeviceAgent:
     """SD-WAN Device Agent for managing edge device operations."""
@@ -19,114 +40,359 @@ class DeviceAgent:
         self.logger = logging.getLogger(__name__)
         self.running = False
         
+        # Set by stop() to cut the interval wait short; bound to the loop in run()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop_event: Optional[asyncio.Event] = None
+        
+        # Controller URL is fixed for the lifetime of the agent
+        self._batch_url = f"{self.controller_endpoint}/api/v1/devices/{self.site_id}/batch"
+        self._timeout = aiohttp.ClientTimeout(total=5)
+        self._json_headers = {'Content-Type': 'application/json'}
+        
+        # /proc inodes are stable, so open them once and pread on every tick
+        self._fd_load = self._open_proc('/proc/loadavg')
+        self._fd_mem = self._open_proc('/proc/meminfo')
+        self._fd_net = self._open_proc('/proc/net/dev')
+        
+        # MemTotal is constant for the kernel's lifetime
+        self._mem_total_kib = self._read_mem_total()
+        
+        # Labelled Prometheus children are resolved once and reused every tick
+        self._cpu_gauge = CPU_USAGE.labels(self.site_id)
+        self._mem_gauge = MEM_USAGE.labels(self.site_id)
+        self._iface_counters: Dict[str, Tuple[Any, Any]] = {}
+        
+        # Per-interface sysfs rx/tx counter descriptors, rescanned every few ticks
+        self._iface_fds: Dict[str, Tuple[int, int]] = {}
+        self._iface_names: Optional[Tuple[str, ...]] = None
+        self._iface_ticks = 0
+        self._iface_rescan_ticks = 10
+        # Two descriptors per interface add up on hosts with many veth/container
+        # interfaces; past this count a single /proc/net/dev read is used instead
+        self._iface_sysfs_max = 64
+        
+        # Sources whose read failure has already been logged, to avoid flooding
+        self._failed_reads: Set[str] = set()
+        
+        # Last counter sample per interface: (rx_bytes, tx_bytes, monotonic time)
+        self._prev_net: Dict[str, Tuple[int, int, float]] = {}
+        
+        # Heartbeats and metrics are buffered and posted together in one request
+        self._buffer: List[Dict[str, Any]] = []
+        # At least one sample, or trimming the buffer after a failed post is a no-op
+        self._buffer_max = max(1, config.get('batch_size', 10))
+        self._flush_interval = config.get('flush_interval', 30)
+        # Backdate the last flush so the first tick is delivered immediately
+        self._last_flush = time.monotonic() - self._flush_interval
+        
     def start(self):
-        """Start the device agent."""
+        """Start the device agent, blocking until it stops."""
+        asyncio.run(self.run())
+    
+    async def run(self):
+        """Run the device agent loop."""
         self.logger.info(f"Starting SD-WAN Device Agent for site: {self.site_id}")
         self.running = True
+        interval = self.config.get('metrics_interval', 30)
+        self._loop = asyncio.get_running_loop()
+        self._stop_event = asyncio.Event()
+        
+        # Wake the interval wait on SIGTERM/SIGINT so shutdown is immediate
+        handled_signals = []
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                self._loop.add_signal_handler(sig, self.stop)
+                handled_signals.append(sig)
+            except (NotImplementedError, RuntimeError, ValueError):
+                # Not on the main thread, or unsupported on this platform
+                pass
         
         try:
-            while self.running:
-                # Send heartbeat to controller
-                self._send_heartbeat()
-                
-                # Collect and send metrics
-                self._collect_metrics()
+            # One long-lived session keeps connections to the controller warm
+            connector = aiohttp.TCPConnector(limit=4, keepalive_timeout=75)
+            async with aiohttp.ClientSession(connector=connector, timeout=self._timeout) as session:
+                while self.running:
+                    self._queue_heartbeat()
+                    self._collect_metrics()
+                    
+                    if (len(self._buffer) >= self._buffer_max
+                            or time.monotonic() - self._last_flush >= self._flush_interval):
+                        await self._flush(session)
+                    
+                    # Wait for the configured interval, or until stop() is called
+                    try:
+                        await asyncio.wait_for(self._stop_event.wait(), interval)
+                    except asyncio.TimeoutError:
+                        pass
                 
-                # Sleep for the configured interval
-                time.sleep(self.config.get('metrics_interval', 30))
-                
-        except KeyboardInterrupt:
-            self.logger.info("Device agent stopped by user")
+                # Deliver whatever is still buffered before shutting down
+                await self._flush(session)
+                    
+        except asyncio.CancelledError:
+            self.logger.info("Device agent cancelled")
+            raise
         except Exception as e:
             self.logger.error(f"Device agent error: {e}")
             raise
+        finally:
+            for sig in handled_signals:
+                self._loop.remove_signal_handler(sig)
+            self._close_proc()
     
     def stop(self):
-        """Stop the device agent."""
+        """Stop the device agent; safe to call from any thread."""
         self.logger.info("Stopping device agent")
         self.running = False
+        if self._stop_event is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._stop_event.set)
     
-    def _send_heartbeat(self):
-        """Send heartbeat to the controller."""
-        try:
-            response = requests.post(
-                f"{self.controller_endpoint}/api/v1/devices/{self.site_id}/heartbeat",
-                json={
-                    "site_id": self.site_id,
-                    "timestamp": time.time(),
-                    "status": "healthy"
-                },
-                timeout=5
-            )
-            if response.status_code == 200:
-                self.logger.debug("Heartbeat sent successfully")
-            else:
-                self.logger.warning(f"Heartbeat failed: {response.status_code}")
-        except Exception as e:
-            self.logger.error(f"Failed to send heartbeat: {e}")
+    def _queue_heartbeat(self):
+        """Buffer a heartbeat for the controller."""
+        self._buffer.append({
+            "type": "heartbeat",
+            "site_id": self.site_id,
+            "timestamp": time.time(),
+            "status": "healthy"
+        })
     
     def _collect_metrics(self):
-        """Collect and send metrics to the controller."""
+        """Collect metrics and buffer them for the controller."""
         try:
             metrics = {
+                "type": "metrics",
                 "site_id": self.site_id,
                 "timestamp": time.time(),
                 "cpu_usage": self._get_cpu_usage(),
                 "memory_usage": self._get_memory_usage(),
                 "network_interfaces": self._get_network_interfaces()
             }
+            self._buffer.append(metrics)
             
-            response = requests.post(
-                f"{self.controller_endpoint}/api/v1/devices/{self.site_id}/metrics",
-                json=metrics,
-                timeout=5
-            )
-            
-            if response.status_code == 200:
-                self.logger.debug("Metrics sent successfully")
-            else:
-                self.logger.warning(f"Metrics failed: {response.status_code}")
-                
+            # Expose the same sample for Prometheus to scrape directly
+            self._cpu_gauge.set(metrics["cpu_usage"])
+            self._mem_gauge.set(metrics["memory_usage"])
         except Exception as e:
             self.logger.error(f"Failed to collect metrics: {e}")
     
+    async def _flush(self, session: aiohttp.ClientSession):
+        """Post all buffered heartbeats and metrics in a single request."""
+        if not self._buffer:
+            return
+        
+        self._last_flush = time.monotonic()
+        try:
+            async with session.post(
+                self._batch_url,
+                data=_dumps(self._buffer),
+                headers=self._json_headers
+            ) as response:
+                if response.status == 200:
+                    # Lazy %-formatting: debug is normally disabled on this per-flush path
+                    self.logger.debug("Sent batch of %d samples", len(self._buffer))
+                    self._buffer.clear()
+                    return
+                self.logger.warning(f"Batch failed: {response.status}")
+        except Exception as e:
+            self.logger.error(f"Failed to send batch: {e}")
+        
+        # Keep the most recent samples for the next attempt without growing unbounded
+        del self._buffer[:-self._buffer_max]
+    
+    def _iface_counter(self, name: str):
+        """Return the cached (rx, tx) Prometheus counters for an interface."""
+        counters = self._iface_counters.get(name)
+        if counters is None:
+            counters = (
+                IFACE_BYTES.labels(self.site_id, name, "rx"),
+                IFACE_BYTES.labels(self.site_id, name, "tx")
+            )
+            self._iface_counters[name] = counters
+        return counters
+    
+    def _log_read_failure(self, source: str, fallback: str = "reporting defaults"):
+        """Log the first failure to read a metric source; later ones stay quiet."""
+        if source not in self._failed_reads:
+            self._failed_reads.add(source)
+            self.logger.warning(f"Failed to read {source}, {fallback}", exc_info=True)
+    
+    def _open_proc(self, path: str):
+        """Open a /proc or sysfs file for repeated reads, or None if unavailable."""
+        try:
+            return os.open(path, os.O_RDONLY)
+        except OSError:
+            return None
+    
+    def _close_proc(self):
+        """Close the cached /proc and sysfs file descriptors."""
+        for attr in ('_fd_load', '_fd_mem', '_fd_net'):
+            fd = getattr(self, attr)
+            if fd is not None:
+                os.close(fd)
+                setattr(self, attr, None)
+        self._close_iface_fds()
+        self._iface_names = None
+    
+    def _close_iface_fds(self):
+        """Close the cached sysfs interface counter descriptors."""
+        for rx_fd, tx_fd in self._iface_fds.values():
+            os.close(rx_fd)
+            os.close(tx_fd)
+        self._iface_fds = {}
+    
+    def _scan_ifaces(self):
+        """Reopen sysfs interface counters if the set of interfaces has changed."""
+        self._iface_ticks = 0
+        try:
+            names = tuple(sorted(os.listdir('/sys/class/net')))
+        except OSError:
+            names = ()
+        if names == self._iface_names:
+            return
+        
+        self._close_iface_fds()
+        self._iface_names = names
+        if len(names) > self._iface_sysfs_max:
+            return
+        
+        try:
+            for name in names:
+                stats = f'/sys/class/net/{name}/statistics/'
+                try:
+                    rx_fd = os.open(stats + 'rx_bytes', os.O_RDONLY)
+                    try:
+                        tx_fd = os.open(stats + 'tx_bytes', os.O_RDONLY)
+                    except OSError:
+                        os.close(rx_fd)
+                        raise
+                except FileNotFoundError:
+                    # Entries without statistics (e.g. bonding_masters), or
+                    # interfaces removed mid-scan, are skipped
+                    continue
+                self._iface_fds[name] = (rx_fd, tx_fd)
+        except OSError:
+            # e.g. EMFILE/ENFILE: release what was opened and use /proc/net/dev
+            # until the next periodic rescan retries sysfs
+            self._log_read_failure('sysfs interface counters', "falling back to /proc/net/dev")
+            self._close_iface_fds()
+            self._iface_names = ()
+    
+    def _read_iface_counters(self) -> List[Tuple[str, int, int]]:
+        """Return (name, rx_bytes, tx_bytes) per interface from sysfs, or /proc/net/dev without it."""
+        if self._iface_names is None or self._iface_ticks >= self._iface_rescan_ticks:
+            self._scan_ifaces()
+        self._iface_ticks += 1
+        
+        if not self._iface_fds:
+            return parse_net_dev(self._read_proc(self._fd_net, '/proc/net/dev', 65536))
+        
+        # Bind the per-interface calls as locals for the loop below
+        pread = os.pread
+        rows: List[Tuple[str, int, int]] = []
+        append = rows.append
+        for name, (rx_fd, tx_fd) in self._iface_fds.items():
+            try:
+                append((name, int(pread(rx_fd, 32, 0)), int(pread(tx_fd, 32, 0))))
+            except (OSError, ValueError):
+                # The interface went away or returned a bad read; skip it and
+                # rescan the interface set on the next tick
+                self._iface_names = None
+        return rows
+    
+    def _read_proc(self, fd, path: str, size: int) -> bytes:
+        """Read a whole /proc file from its cached descriptor, reopening if that fails."""
+        data = os.pread(fd, size, 0) if fd is not None else b''
+        if not data:
+            with open(path, 'rb') as f:
+                return f.read()
+        
+        # A full buffer may have cut the file off, so keep reading until a short read
+        if len(data) == size:
+            chunks = [data]
+            offset = size
+            while True:
+                chunk = os.pread(fd, size, offset)
+                chunks.append(chunk)
+                offset += len(chunk)
+                if len(chunk) < size:
+                    break
+            data = b''.join(chunks)
+        return data
+    
     def _get_cpu_usage(self):
         """Get CPU usage percentage."""
         try:
-            with open('/proc/loadavg', 'r') as f:
-                load = f.read().split()[0]
-                return float(load)
-        except:
+            load = self._read_proc(self._fd_load, '/proc/loadavg', 64).partition(b' ')[0]
+            return float(load)
+        except (OSError, ValueError):
+            self._log_read_failure('/proc/loadavg')
             return 0.0
     
+    def _read_mem_total(self) -> int:
+        """Read MemTotal in kB, or 0 if /proc/meminfo is unreadable."""
+        try:
+            return self._meminfo_kib(self._read_proc(self._fd_mem, '/proc/meminfo', 4096), b'MemTotal:')
+        except (OSError, ValueError):
+            return 0
+    
     def _get_memory_usage(self):
         """Get memory usage percentage."""
         try:
-            with open('/proc/meminfo', 'r') as f:
-                lines = f.readlines()
-                total = int(lines[0].split()[1])
-                available = int(lines[2].split()[1])
-                used = total - available
-                return (used / total) * 100
-        except:
+            data = self._read_proc(self._fd_mem, '/proc/meminfo', 4096)
+            available = self._meminfo_kib(data, b'MemAvailable:')
+            if not self._mem_total_kib:
+                self._mem_total_kib = self._read_mem_total()
+                if not self._mem_total_kib:
+                    raise ValueError("MemTotal not found in /proc/meminfo")
+            return (1 - available / self._mem_total_kib) * 100
+        except (OSError, ValueError):
+            self._log_read_failure('/proc/meminfo')
             return 0.0
     
+    @staticmethod
+    def _meminfo_kib(data: bytes, key: bytes) -> int:
+        """Extract a kB value from raw /proc/meminfo bytes."""
+        start = data.index(key) + len(key)
+        return int(data[start:data.index(b' kB', start)])
+    
     def _get_network_interfaces(self):
-        """Get network interface information."""
+        """Get network interface counters and rates since the previous sample."""
         try:
-            with open('/proc/net/dev', 'r') as f:
-                lines = f.readlines()[2:]  # Skip header lines
-                interfaces = {}
-                for line in lines:
-                    parts = line.split()
-                    if len(parts) >= 10:
-                        name = parts[0].rstrip(':')
-                        rx_bytes = int(parts[1])
-                        tx_bytes = int(parts[9])
-                        interfaces[name] = {
-                            "rx_bytes": rx_bytes,
-                            "tx_bytes": tx_bytes
-                        }
-                return interfaces
-        except:
+            rows = self._read_iface_counters()
+            now = time.monotonic()
+            # Bind the per-interface lookups as locals for the loop below
+            prev_net = self._prev_net
+            iface_counter = self._iface_counter
+            current = {}
+            interfaces = {}
+            for name, rx_bytes, tx_bytes in rows:
+                current[name] = (rx_bytes, tx_bytes, now)
+                
+                info = {
+                    "rx_bytes": rx_bytes,
+                    "tx_bytes": tx_bytes
+                }
+                
+                # Rates need a prior sample; skip them after a counter reset too
+                prev = prev_net.get(name)
+                if prev is not None and now > prev[2] and rx_bytes >= prev[0] and tx_bytes >= prev[1]:
+                    dt = now - prev[2]
+                    info["rx_bps"] = (rx_bytes - prev[0]) * 8 / dt
+                    info["tx_bps"] = (tx_bytes - prev[1]) * 8 / dt
+                    
+                    rx_counter, tx_counter = iface_counter(name)
+                    rx_counter.inc(rx_bytes - prev[0])
+                    tx_counter.inc(tx_bytes - prev[1])
+                
+                interfaces[name] = info
+            
+            # Replace rather than update so vanished interfaces are forgotten,
+            # along with their Prometheus series
+            for name in prev_net.keys() - current.keys():
+                if self._iface_counters.pop(name, None) is not None:
+                    IFACE_BYTES.remove(self.site_id, name, "rx")
+                    IFACE_BYTES.remove(self.site_id, name, "tx")
+            self._prev_net = current
+            return interfaces
+        except (OSError, ValueError):
+            self._log_read_failure('network interface counters')
             return {}
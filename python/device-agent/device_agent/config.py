@@ -7,6 +7,17 @@ import os
 import yaml
 from typing import Dict, Any
 
+# Environment variables that override config values: (variable, key, type)
+_ENV_OVERRIDES = (
+    ('SITE_ID', 'site_id', str),
+    ('CONTROLLER_ENDPOINT', 'controller_endpoint', str),
+    ('LOG_LEVEL', 'log_level', str),
+    ('METRICS_INTERVAL', 'metrics_interval', int),
+    ('PROMETHEUS_PORT', 'prometheus_port', int),
+    ('BATCH_SIZE', 'batch_size', int),
+    ('FLUSH_INTERVAL', 'flush_interval', int),
+)
+
 def load_config() -> Dict[str, Any]:
     """Load configuration from file or environment variables."""
     
@@ -16,6 +27,8 @@ def load_config() -> Dict[str, Any]:
         'controller_endpoint': 'http://localhost:8080',
         'log_level': 'INFO',
         'metrics_interval': 30,
+        'batch_size': 10,
+        'flush_interval': 30,
         'prometheus_port': 9092
     }
     
@@ -25,31 +38,22 @@ def load_config() -> Dict[str, Any]:
     try:
         if os.path.exists(config_file):
             with open(config_file, 'r') as f:
-                file_config = yaml.safe_load(f) or {}
+                # Prefer the libyaml-backed safe loader when PyYAML was built with it
+                if hasattr(yaml, 'CSafeLoader'):
+                    file_config = yaml.load(f, Loader=yaml.CSafeLoader) or {}
+                else:
+                    file_config = yaml.safe_load(f) or {}
                 default_config.update(file_config)
     except Exception as e:
         print(f"Warning: Could not load config file {config_file}: {e}")
     
     # Override with environment variables
-    if os.environ.get('SITE_ID'):
-        default_config['site_id'] = os.environ['SITE_ID']
-    
-    if os.environ.get('CONTROLLER_ENDPOINT'):
-        default_config['controller_endpoint'] = os.environ['CONTROLLER_ENDPOINT']
-    
-    if os.environ.get('LOG_LEVEL'):
-        default_config['log_level'] = os.environ['LOG_LEVEL']
-    
-    if os.environ.get('METRICS_INTERVAL'):
-        try:
-            default_config['metrics_interval'] = int(os.environ['METRICS_INTERVAL'])
-        except ValueError:
-            pass
-    
-    if os.environ.get('PROMETHEUS_PORT'):
-        try:
-            default_config['prometheus_port'] = int(os.environ['PROMETHEUS_PORT'])
-        except ValueError:
-            pass
+    for env_name, key, cast in _ENV_OVERRIDES:
+        value = os.environ.get(env_name)
+        if value:
+            try:
+                default_config[key] = cast(value)
+            except ValueError:
+                print(f"Warning: Ignoring invalid {env_name}={value!r}")
     
     return default_config
@@ -5,21 +5,22 @@ SD-WAN Device Agent
 Manages device configuration, telemetry collection, and communication with the controller.
 """
 
-import asyncio
+from __future__ import annotations
+
 import os
 import signal
 import sys
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
 
 import click
-import structlog
-from prometheus_client import start_http_server
 
-from device_agent.config import Config
-from device_agent.controller import ControllerClient
-from device_agent.telemetry import TelemetryCollector
-from device_agent.watcher import ConfigWatcher
+# Heavy dependencies are imported where they are used so that CLI startup
+# (e.g. --help) does not pay for them
+if TYPE_CHECKING:
+    import structlog
+
+    from device_agent.config import Config
 
 
 @click.command()
@@ -37,6 +38,21 @@ def main(
 ) -> None:
     """SD-WAN Device Agent"""
     
+    import asyncio
+
+    import orjson
+    import structlog
+    from prometheus_client import start_http_server
+
+    from device_agent.config import Config
+
+    # Use the libuv-based event loop when available
+    try:
+        import uvloop
+        uvloop.install()
+    except ImportError:
+        pass
+    
     # Setup logging
     structlog.configure(
         processors=[
@@ -48,7 +64,9 @@ def main(
             structlog.processors.StackInfoRenderer(),
             structlog.processors.format_exc_info,
             structlog.processors.UnicodeDecoder(),
-            structlog.processors.JSONRenderer()
+            structlog.processors.JSONRenderer(
+                serializer=lambda obj, **kw: orjson.dumps(obj, **kw).decode()
+            )
         ],
         wrapper_class=structlog.stdlib.BoundLogger,
         logger_factory=structlog.stdlib.LoggerFactory(),
@@ -90,6 +108,12 @@ async def run_agent(
 ) -> None:
     """Run the device agent"""
     
+    import asyncio
+
+    from device_agent.controller import ControllerClient
+    from device_agent.telemetry import TelemetryCollector
+    from device_agent.watcher import ConfigWatcher
+    
     # Initialize components
     controller_client = ControllerClient(controller_url, site_id)
     telemetry_collector = TelemetryCollector(config)
@@ -118,6 +142,8 @@ async def run_agent(
 
 async def shutdown(tasks: list, logger: structlog.BoundLogger) -> None:
     """Gracefully shutdown the agent"""
+    import asyncio
+    
     logger.info("Shutting down agent")
     
     # Cancel all tasks
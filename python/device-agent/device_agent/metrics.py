@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Device Agent Prometheus Metrics
+
+Metric objects are created once at import time and only updated afterwards.
+"""
+
+from prometheus_client import Counter, Gauge
+
+CPU_USAGE = Gauge(
+    "sdwan_cpu_usage",
+    "One-minute load average reported by the device",
+    ["site_id"]
+)
+
+MEM_USAGE = Gauge(
+    "sdwan_memory_usage_percent",
+    "Percentage of memory in use on the device",
+    ["site_id"]
+)
+
+IFACE_BYTES = Counter(
+    "sdwan_iface_bytes",
+    "Bytes transferred per network interface",
+    ["site_id", "iface", "dir"]
+)
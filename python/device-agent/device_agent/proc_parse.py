@@ -0,0 +1,22 @@
+#!/usr/bin/env python3
+"""
+SD-WAN Device Agent /proc Parsers
+
+Pure-Python versions of the parsers compiled from _proc_parse.pyx.
+"""
+
+from typing import List, Tuple
+
+
+def parse_net_dev(buf: bytes) -> List[Tuple[str, int, int]]:
+    """Return (name, rx_bytes, tx_bytes) for every interface in /proc/net/dev."""
+    rows = []
+    for line in buf.split(b'\n')[2:]:  # Skip header lines
+        # Counters may be glued to the name ("eth0:123"), so split on the colon
+        name, sep, counters = line.partition(b':')
+        if not sep:
+            continue
+        fields = counters.split(None, 9)
+        if len(fields) >= 9:
+            rows.append((name.strip().decode(), int(fields[0]), int(fields[8])))
+    return rows
@@ -1,4 +1,4 @@
-from setuptools import setup, find_packages
+from setuptools import Extension, setup, find_packages
 
 # Read README if available, otherwise use a default description
 try:
@@ -7,6 +7,23 @@ try:
 except FileNotFoundError:
     long_description = "SD-WAN Device Agent for configuration management and telemetry"
 
+# Compile the /proc parsers. Cython is a build requirement in pyproject.toml, so
+# the parser is normally cythonized; the extension is optional, so hosts without
+# a C compiler still install and the agent uses the pure-Python parsers in
+# device_agent/proc_parse.py. The ImportError branch only covers legacy
+# setup.py builds run without Cython.
+try:
+    from Cython.Build import cythonize
+    ext_modules = cythonize(
+        [Extension("device_agent._proc_parse", ["device_agent/_proc_parse.pyx"])],
+        language_level=3,
+    )
+    # cythonize() does not carry optional= over to the extensions it returns
+    for ext in ext_modules:
+        ext.optional = True
+except ImportError:
+    ext_modules = []
+
 setup(
     name="sdwan-device-agent",
     version="0.1.0",
@@ -17,6 +34,7 @@ setup(
     long_description_content_type="text/markdown",
     url="https://github.com/sdwan/speedfusion-like",
     packages=find_packages(),
+    ext_modules=ext_modules,
     classifiers=[
         "Development Status :: 3 - Alpha",
         "Intended Audience :: System Administrators",
@@ -32,13 +50,16 @@ setup(
     install_requires=[
         "prometheus-client>=0.16.0",
         "requests>=2.28.0",
+        # PyYAML wheels bundle libyaml; source builds need libyaml-dev for CSafeLoader
         "pyyaml>=6.0",
         "psutil>=5.9.0",
         "netifaces>=0.11.0",
         "click>=8.1.0",
         "structlog>=23.0.0",
         "aiohttp>=3.8.0",
+        "orjson>=3.9.0",
         "asyncio-mqtt>=0.11.0",
+        "uvloop>=0.19; platform_system != 'Windows'",
     ],
     extras_require={
         "dev": [
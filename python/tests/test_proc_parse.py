@@ -0,0 +1,52 @@
+"""Tests for the /proc/net/dev parsers."""
+
+import os
+
+import pytest
+
+from device_agent.proc_parse import parse_net_dev
+
+HEADER = (
+    b"Inter-|   Receive                                                |  Transmit\n"
+    b" face |bytes    packets errs drop fifo frame compressed multicast|bytes    packets"
+    b" errs drop fifo colls carrier compressed\n"
+)
+
+SAMPLES = {
+    "typical": HEADER
+    + b"    lo: 1302991    1204    0    0    0     0          0         0  1302991    1204"
+    b"    0    0    0     0       0          0\n"
+    b"  eth0:    1188      14    0    0    0     0          0         0     1489      17"
+    b"    0    0    0     0       0          0\n",
+    "glued name": HEADER
+    + b"eth1:4294967296 1 0 0 0 0 0 0 77 2 0 0 0 0 0 0\n",
+    "max counter": HEADER
+    + b"  eth9:18446744073709551615 1 2 3 4 5 6 7 99 1 1\n",
+    "short and junk lines": HEADER
+    + b"bad line\n  x: 1 2\n  y: 1 2 3 4 5 6 7 8 9\n",
+    "no trailing newline": HEADER + b"  z: 5 0 0 0 0 0 0 0 6 0 0 0 0 0 0 0",
+    "header only": HEADER,
+}
+
+
+def test_parse_net_dev_extracts_rx_and_tx():
+    assert parse_net_dev(SAMPLES["typical"]) == [
+        ("lo", 1302991, 1302991),
+        ("eth0", 1188, 1489),
+    ]
+    assert parse_net_dev(SAMPLES["glued name"]) == [("eth1", 4294967296, 77)]
+    assert parse_net_dev(SAMPLES["short and junk lines"]) == [("y", 1, 9)]
+
+
+@pytest.mark.parametrize("name", sorted(SAMPLES))
+def test_compiled_parser_matches_python(name):
+    compiled = pytest.importorskip("device_agent._proc_parse")
+    assert compiled.parse_net_dev(SAMPLES[name]) == parse_net_dev(SAMPLES[name])
+
+
+@pytest.mark.skipif(not os.path.exists("/proc/net/dev"), reason="requires /proc/net/dev")
+def test_compiled_parser_matches_python_on_live_proc():
+    compiled = pytest.importorskip("device_agent._proc_parse")
+    with open("/proc/net/dev", "rb") as f:
+        buf = f.read()
+    assert compiled.parse_net_dev(buf) == parse_net_dev(buf)